@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Benchmark Turboship provisioning flows against a sandboxed fake host.
+
+Each app count runs in its own child process with every TURBOSHIP_* path
+pointed into a temporary root and stub nginx/certbot/pm2/mysql/psql/useradd
+binaries first on PATH, so nothing on the real host is touched.
+
+Usage:
+    python3 bench/benchmark.py                        # 10, 100 and 1000 apps
+    python3 bench/benchmark.py --sizes 10,100 --latency 0.01
+    python3 bench/benchmark.py --save bench/baseline.json
+    python3 bench/benchmark.py --baseline bench/baseline.json
+"""
+import argparse
+import builtins
+import io
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from tabulate import tabulate
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STEPS = ["create_app", "configure_nginx", "install_ssl", "list_apps", "delete_app", "delete_matching_apps"]
+# Steps that work on the whole fleet are compared per app rather than per call
+FLEET_STEPS = {"list_apps", "delete_matching_apps"}
+LIST_REPEAT = 5
+
+# Stub bodies run after an optional sleep of $BENCH_LATENCY seconds
+STUBS = {
+    "id": "exit 1",
+    "pgrep": "exit 1",
+    "curl": "echo 203.0.113.10",
+    "sudo": 'while [ "$1" = "-u" ]; do shift 2; done\nexec "$@"',
+    "useradd": 'while [ $# -gt 0 ]; do [ "$1" = "-d" ] && mkdir -p "$2"; shift; done',
+    "certbot": '''mkdir -p "$TURBOSHIP_LETSENCRYPT_DIR/renewal"
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -d) touch "$TURBOSHIP_LETSENCRYPT_DIR/renewal/$2.conf"; exit 0 ;;
+        --cert-name) rm -f "$TURBOSHIP_LETSENCRYPT_DIR/renewal/$2.conf"; exit 0 ;;
+    esac
+    shift
+done''',
+}
+NOOP_STUBS = ["nginx", "systemctl", "pm2", "mysql", "psql", "userdel", "usermod",
+              "chpasswd", "chown", "chmod", "loginctl", "pkill"]
+
+
+def make_fake_root(latency):
+    """Create a temporary host root with stub binaries and return (root, env)."""
+    root = tempfile.mkdtemp(prefix="turboship-bench-")
+    bin_dir = os.path.join(root, "bin")
+    os.makedirs(bin_dir)
+    for name in list(STUBS) + NOOP_STUBS:
+        with open(os.path.join(bin_dir, name), "w") as f:
+            f.write(f'#!/bin/sh\n[ -n "$BENCH_LATENCY" ] && sleep "$BENCH_LATENCY"\n{STUBS.get(name, "exit 0")}\n')
+        os.chmod(os.path.join(bin_dir, name), 0o755)
+    for sub in ("etc/nginx/sites-available", "etc/nginx/sites-enabled", "var/www", "opt/turboship"):
+        os.makedirs(os.path.join(root, sub))
+
+    env = os.environ.copy()
+    env.update({
+        "PATH": bin_dir + os.pathsep + env.get("PATH", ""),
+        "BENCH_LATENCY": str(latency) if latency else "",
+        "TURBOSHIP_DB_PATH": os.path.join(root, "opt/turboship/turboship.db"),
+        "TURBOSHIP_BASE_DIR": os.path.join(root, "var/www"),
+        "TURBOSHIP_NGINX_DIR": os.path.join(root, "etc/nginx"),
+        "TURBOSHIP_LETSENCRYPT_DIR": os.path.join(root, "etc/letsencrypt"),
+        "TURBOSHIP_LOG_FILE": os.path.join(root, "turboship.log"),
+        "TURBOSHIP_TRACE_FILE": os.path.join(root, "trace.jsonl"),
+        # Point native DB drivers at sockets that do not exist so the CLI stubs are used
+        "TURBOSHIP_MYSQL_SOCKET": os.path.join(root, "run/mysqld.sock"),
+        "TURBOSHIP_PG_SOCKET_DIR": os.path.join(root, "run"),
+    })
+    return root, env
+
+
+class Recorder:
+    """Inclusive wall time and subprocess counts per step."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = []
+        self.stats = {name: {"calls": 0, "wall": 0.0, "subprocesses": 0} for name in STEPS}
+
+    def count_subprocess(self):
+        with self.lock:
+            for name in self.active:
+                self.stats[name]["subprocesses"] += 1
+
+    def wrap(self, name, func):
+        def timed(*args, **kwargs):
+            self.active.append(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.active.remove(name)
+                self.stats[name]["calls"] += 1
+                self.stats[name]["wall"] += elapsed
+        return timed
+
+
+def run_worker(apps, result_path):
+    """Drive the flows in this (sandboxed) process and write stats as JSON."""
+    sys.path.insert(0, REPO_DIR)
+    import turboship
+
+    recorder = Recorder()
+    real_popen = subprocess.Popen
+    real_system = os.system
+
+    class CountingPopen(real_popen):
+        def __init__(self, *args, **kwargs):
+            recorder.count_subprocess()
+            super().__init__(*args, **kwargs)
+
+    def counting_system(command):
+        recorder.count_subprocess()
+        return real_system(command)
+
+    subprocess.Popen = CountingPopen
+    os.system = counting_system
+    # The app users only exist in the stubs
+    shutil.chown = lambda *args, **kwargs: None
+    for name in STEPS:
+        setattr(turboship, name, recorder.wrap(name, getattr(turboship, name)))
+
+    def answer(*values):
+        it = iter(values)
+        builtins.input = lambda *args: next(it)
+
+    names = [f"bench{i:05d}" for i in range(apps)]
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        turboship.init_db()
+        for i, name in enumerate(names):
+            answer(name, "1" if i % 2 else "2")
+            turboship.create_app()
+        for _ in range(LIST_REPEAT):
+            turboship.list_apps()
+        for name in names[:max(1, apps // 10)]:
+            answer("yes")
+            turboship.delete_app(name)
+        answer("yes")
+        turboship.delete_matching_apps("bench*")
+    total = time.perf_counter() - start
+
+    conn = sqlite3.connect(turboship.DB_PATH)
+    remaining = conn.execute("SELECT COUNT(*) FROM apps").fetchone()[0]
+    conn.close()
+
+    with open(result_path, "w") as f:
+        json.dump({"apps": apps, "total_wall": total, "remaining": remaining, "steps": recorder.stats}, f)
+
+
+def run_size(apps, latency, keep):
+    root, env = make_fake_root(latency)
+    result_path = os.path.join(root, "result.json")
+    try:
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", str(apps), "--result", result_path],
+                       env=env, check=True)
+        with open(result_path) as f:
+            return json.load(f)
+    finally:
+        if keep:
+            print(f"Fake root kept at {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def per_call(step):
+    calls = step["calls"] or 1
+    return step["wall"] / calls, step["subprocesses"] / calls
+
+
+def unit_cost(result, name):
+    """Per-call cost, or per-app cost for fleet-wide steps."""
+    wall, procs = per_call(result["steps"][name])
+    if name in FLEET_STEPS:
+        return wall / result["apps"], procs / result["apps"]
+    return wall, procs
+
+
+def find_regressions(results, max_growth, baseline=None, tolerance=0.25):
+    """Flag steps whose per-call cost grows with app count or exceeds the baseline."""
+    problems = []
+    for result in results:
+        if result["remaining"]:
+            problems.append(f"{result['apps']} apps: {result['remaining']} apps left in DB after teardown")
+
+    smallest, largest = results[0], results[-1]
+    for name in STEPS:
+        unit = "app" if name in FLEET_STEPS else "call"
+        small_wall, small_procs = unit_cost(smallest, name)
+        large_wall, large_procs = unit_cost(largest, name)
+        if small_wall and large_wall / small_wall > max_growth:
+            problems.append(f"{name}: time per {unit} grew {large_wall / small_wall:.1f}x "
+                            f"from {smallest['apps']} to {largest['apps']} apps")
+        if large_procs > small_procs * 1.1 + 0.5:
+            problems.append(f"{name}: subprocesses per {unit} grew from {small_procs:.1f} to {large_procs:.1f}")
+
+    if baseline:
+        base_by_size = {r["apps"]: r for r in baseline}
+        for result in results:
+            base = base_by_size.get(result["apps"])
+            if not base:
+                continue
+            for name in STEPS:
+                wall, procs = unit_cost(result, name)
+                base_wall, base_procs = unit_cost(base, name)
+                if base_wall and wall > base_wall * (1 + tolerance):
+                    problems.append(f"{name} @ {result['apps']} apps: {wall * 1000:.2f} ms "
+                                    f"vs baseline {base_wall * 1000:.2f} ms")
+                if procs > base_procs:
+                    problems.append(f"{name} @ {result['apps']} apps: {procs:.1f} subprocesses "
+                                    f"vs baseline {base_procs:.1f}")
+    return problems
+
+
+def print_report(results):
+    rows = []
+    for result in results:
+        for name in STEPS:
+            step = result["steps"][name]
+            wall, procs = per_call(step)
+            rows.append([result["apps"], name, step["calls"], f"{step['wall']:.3f}", f"{wall * 1000:.2f}",
+                         step["subprocesses"], f"{procs:.1f}"])
+    headers = ["Apps", "Step", "Calls", "Wall (s)", "ms/call", "Subprocs", "Subprocs/call"]
+    print(tabulate(rows, headers=headers, tablefmt="github"))
+    for result in results:
+        print(f"{result['apps']} apps: {result['total_wall']:.2f}s total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Turboship provisioning flows on a sandboxed fake host")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated app counts (default: 10,100,1000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each stub binary sleeps (default: 0)")
+    parser.add_argument("--max-growth", type=float, default=3.0,
+                        help="Allowed per-call time growth from smallest to largest size (default: 3.0)")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (default: 0.25)")
+    parser.add_argument("--save", metavar="FILE", help="Save results as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the fake roots for inspection")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args.result)
+        return
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    results = []
+    for apps in sizes:
+        print(f"Running {apps} apps...", flush=True)
+        results.append(run_size(apps, args.latency, args.keep))
+
+    print_report(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    problems = find_regressions(results, args.max_growth, baseline, args.tolerance)
+    if problems:
+        print("\nRegressions:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print("\nNo regressions detected.")
+
+
+if __name__ == "__main__":
+    main()
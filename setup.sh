@@ -19,7 +19,7 @@ sudo apt install -y nginx python3 python3-pip python3-venv git mariadb-server po
 
 # 2. Python Packages for CLI
 echo "🐍 Installing Python packages..."
-sudo pip3 install --break-system-packages tabulate colorama || { echo "Python package installation failed"; exit 1; }
+sudo pip3 install --break-system-packages tabulate colorama pymysql psycopg2-binary || { echo "Python package installation failed"; exit 1; }
 
 # 3. Setup NGINX
 sudo systemctl enable nginx
@@ -52,6 +52,10 @@ sudo systemctl restart mariadb
 echo "🌐 Configuring PostgreSQL for remote access..."
 echo "host    all             all             0.0.0.0/0               md5" | sudo tee -a /etc/postgresql/*/main/pg_hba.conf
 sudo sed -i "s|^#listen_addresses = 'localhost'|listen_addresses = '*'|" /etc/postgresql/*/main/postgresql.conf || { echo "PostgreSQL configuration failed"; exit 1; }
+# Let root (which runs Turboship) connect as postgres over the local socket
+echo "turboship       root                    postgres" | sudo tee -a /etc/postgresql/*/main/pg_ident.conf
+echo "turboship       postgres                postgres" | sudo tee -a /etc/postgresql/*/main/pg_ident.conf
+sudo sed -i -E "s/^(local\s+all\s+postgres\s+peer)\s*$/\1 map=turboship/" /etc/postgresql/*/main/pg_hba.conf || { echo "PostgreSQL configuration failed"; exit 1; }
 sudo systemctl restart postgresql
 
 # 9. Configure SSH for SFTP with chroot
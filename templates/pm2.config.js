@@ -0,0 +1,14 @@
+module.exports = {
+    apps: [
+        {
+            name: "{app_name}-backend",
+            script: "npm start",
+            cwd: "{api_path}",
+            watch: false,
+            env: {
+                NODE_ENV: "production",
+                PORT: {port}
+            }
+        }
+    ]
+};
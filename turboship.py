@@ -6,16 +6,57 @@ import socket
 import re
 import sqlite3
 import argparse
+import collections
+import contextvars
+import fnmatch
+import functools
+import hashlib
+import http.client
+import http.server
+import inspect
+import io
+import itertools
+import json
+import queue
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing, contextmanager
 from datetime import datetime
 from tabulate import tabulate
 from termcolor import colored
 from pyfiglet import figlet_format
 import logging
 
+# Optional native database drivers; the mysql/psql CLIs are used when missing
+try:
+    import pymysql
+except ImportError:
+    pymysql = None
+try:
+    import psycopg
+except ImportError:
+    try:
+        import psycopg2 as psycopg
+    except ImportError:
+        psycopg = None
+
 TURBOSHIP_VERSION = "0.8"
-LOG_FILE = "/var/log/turboship.log"
+LOG_FILE = os.getenv("TURBOSHIP_LOG_FILE", "/var/log/turboship.log")
+TRACE_FILE = os.getenv("TURBOSHIP_TRACE_FILE", "/var/log/turboship-trace.jsonl")
 DB_PATH = os.getenv("TURBOSHIP_DB_PATH", "/opt/turboship/turboship.db")
 BASE_DIR = os.getenv("TURBOSHIP_BASE_DIR", "/var/www")
+NGINX_DIR = os.getenv("TURBOSHIP_NGINX_DIR", "/etc/nginx")
+LETSENCRYPT_DIR = os.getenv("TURBOSHIP_LETSENCRYPT_DIR", "/etc/letsencrypt")
+MYSQL_SOCKET = os.getenv("TURBOSHIP_MYSQL_SOCKET", "/run/mysqld/mysqld.sock")
+PG_SOCKET_DIR = os.getenv("TURBOSHIP_PG_SOCKET_DIR", "/var/run/postgresql")
+TEMPLATE_DIR = os.getenv("TURBOSHIP_TEMPLATE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates"))
+APP_TEMPLATE_DIR = os.path.join(os.path.dirname(DB_PATH), "templates")
 
 # Configure logging
 logging.basicConfig(
@@ -24,18 +65,185 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# ---- Tracing ----
+# Every subprocess, SQL query, file write and NGINX reload runs inside a span.
+# Finished spans are appended to TRACE_FILE as JSON lines; with --profile they
+# are also kept in memory for the summary printed at exit.
+_current_span = contextvars.ContextVar("turboship_span", default=None)
+_span_ids = itertools.count(1)
+_trace_lock = threading.Lock()
+_trace_file = None
+_profile_spans = None
+
+def _mask(text, secrets):
+    for secret in secrets:
+        if secret:
+            text = text.replace(secret, "***")
+    return text
+
+def _write_span(record):
+    global _trace_file
+    with _trace_lock:
+        if _profile_spans is not None:
+            _profile_spans.append(record)
+        if _trace_file is None and TRACE_FILE:
+            try:
+                _trace_file = open(TRACE_FILE, "a", buffering=1)
+            except OSError as e:
+                logging.warning(f"Tracing disabled, cannot open {TRACE_FILE}: {e}")
+                _trace_file = False
+        if _trace_file:
+            _trace_file.write(json.dumps(dict(record, path=";".join(record["path"]))) + "\n")
+
+@contextmanager
+def span(name, app=None, **attrs):
+    """Time a block as a span nested under the current one."""
+    parent = _current_span.get()
+    record = {
+        "ts": time.time(),
+        "pid": os.getpid(),
+        "id": next(_span_ids),
+        "parent": parent["id"] if parent else None,
+        "name": name,
+        "app": app or (parent["app"] if parent else None),
+        "path": (parent["path"] if parent else ()) + (name,),
+        "attrs": attrs
+    }
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = repr(e)
+        raise
+    finally:
+        record["dur_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        _current_span.reset(token)
+        _write_span(record)
+
+def set_span_app(app):
+    """Attach an app to the current span once it is known (e.g. after a prompt)."""
+    record = _current_span.get()
+    if record:
+        record["app"] = app
+
+def traced(func):
+    """Run a function in a span named after it, picking up its 'app' argument."""
+    signature = inspect.signature(func)
+    has_app = "app" in signature.parameters
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        app = signature.bind_partial(*args, **kwargs).arguments.get("app") if has_app else None
+        with span(func.__name__, app=app):
+            return func(*args, **kwargs)
+    return wrapper
+
+def _submit(pool, fn, *args):
+    """pool.submit that keeps the caller's span as parent inside the worker thread."""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+def enable_profiling():
+    global _profile_spans
+    _profile_spans = []
+
+def print_profile():
+    """Print a flame-style tree of inclusive wall time per span path."""
+    if not _profile_spans:
+        return
+    stats = {}
+    for record in _profile_spans:
+        entry = stats.setdefault(record["path"], [0, 0.0])
+        entry[0] += 1
+        entry[1] += record["dur_ms"] / 1000
+    total = sum(secs for path, (_, secs) in stats.items() if len(path) == 1) or 1.0
+
+    print(colored("\nProfile (inclusive wall time; parallel steps may exceed their parent):", "cyan"))
+    def walk(prefix):
+        children = [p for p in stats if len(p) == len(prefix) + 1 and p[:len(prefix)] == prefix]
+        for path in sorted(children, key=lambda p: -stats[p][1]):
+            count, secs = stats[path]
+            label = "  " * len(prefix) + path[-1]
+            print(f"{label:<48} {count:>5}x {secs:>9.3f}s {secs / total:>7.1%} {'█' * max(1, round(secs / total * 30))}")
+            walk(path)
+    walk(())
+
+def run_shell(command, secrets=()):
+    """Traced os.system(): returns the raw wait status."""
+    shown = _mask(command, secrets)
+    with span(f"exec {command.split()[0]}", cmd=shown) as record:
+        result = os.system(command)
+        record["attrs"]["status"] = result
+    logging.info(f"Ran: {shown} (status {result}, {record['dur_ms']:.0f} ms)")
+    return result
+
+def run_command(cmd, secrets=(), **kwargs):
+    """Traced subprocess.run()."""
+    shown = _mask(cmd if isinstance(cmd, str) else " ".join(cmd), secrets)
+    program = os.path.basename(shown.split()[0])
+    with span(f"exec {program}", cmd=shown) as record:
+        result = subprocess.run(cmd, **kwargs)
+        record["attrs"]["status"] = result.returncode
+    logging.info(f"Ran: {shown} (status {result.returncode}, {record['dur_ms']:.0f} ms)")
+    return result
+
+# Set by serve() so concurrent jobs share reloads
+_reload_batcher = None
+
+def reload_nginx():
+    """Test the NGINX config and reload it. Returns True on success."""
+    if _reload_batcher:
+        return _reload_batcher.reload()
+    return _reload_nginx_now()
+
+def _reload_nginx_now():
+    with span("nginx.reload"):
+        return run_shell("nginx -t && systemctl reload nginx") == 0
+
+def _sql_span(sql, engine="sqlite"):
+    words = sql.split()
+    return span(f"sql {words[0].upper() if words else ''}", engine=engine, sql=redact_sql(" ".join(words)))
+
+class TracedCursor(sqlite3.Cursor):
+    def execute(self, sql, *args):
+        with _sql_span(sql):
+            return super().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        with _sql_span(sql):
+            return super().executemany(sql, *args)
+
+class TracedConnection(sqlite3.Connection):
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args):
+        return self.cursor().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        return self.cursor().executemany(sql, *args)
+
+def db_connect():
+    """Open the metadata DB with every query traced."""
+    return sqlite3.connect(DB_PATH, timeout=30, factory=TracedConnection)
+
 def log_and_run(command):
     """Run a shell command and log it."""
-    logging.info(f"Running command: {command}")
-    result = os.system(command)
+    result = run_shell(command)
     if result != 0:
         logging.error(f"Command failed: {command}")
         raise Exception(f"Command failed: {command}")
 
+def _run_quiet(cmd, **kwargs):
+    """Run a command with output discarded and return its exit code."""
+    return run_command(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs).returncode
+
 def init_db():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_connect()
     c = conn.cursor()
+    # WAL lets readers proceed while the daemon's workers write
+    c.execute("PRAGMA journal_mode=WAL")
     c.execute('''
         CREATE TABLE IF NOT EXISTS apps (
             app TEXT PRIMARY KEY,
@@ -51,14 +259,52 @@ def init_db():
             created_at TEXT
         )
     ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS scaffold_files (
+            app TEXT,
+            path TEXT,
+            template TEXT,
+            vars TEXT,
+            owner TEXT,
+            mode INTEGER,
+            hash TEXT,
+            PRIMARY KEY (app, path)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT,
+            params TEXT,
+            status TEXT,
+            error TEXT,
+            created_at TEXT,
+            started_at TEXT,
+            finished_at TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS job_output (
+            job_id INTEGER,
+            seq INTEGER,
+            line TEXT,
+            PRIMARY KEY (job_id, seq)
+        )
+    ''')
     conn.commit()
     conn.close()
 
 
+_public_ip = None
+
 def get_public_ip():
+    global _public_ip
+    if _public_ip:
+        return _public_ip
     try:
-        ip = subprocess.check_output("curl -s ifconfig.me", shell=True).decode().strip()
+        ip = run_command("curl -s ifconfig.me", shell=True, stdout=subprocess.PIPE, check=True).stdout.decode().strip()
         socket.inet_aton(ip)  # Validate IP
+        _public_ip = ip
         return ip
     except:
         print(colored("❌ Failed to retrieve valid public IP. Cannot generate sslip.io domain.", "red"))
@@ -70,6 +316,349 @@ def generate_password(length=12):
 def validate_app_name(name):
     return re.match("^[a-zA-Z0-9_-]+$", name) is not None
 
+_SECRET_SQL_RE = re.compile(r"((?:PASSWORD|IDENTIFIED BY)\s+)'((?:[^']|'')*)'", re.IGNORECASE)
+
+def redact_sql(sql):
+    """Mask password literals so admin SQL can be logged."""
+    return _SECRET_SQL_RE.sub(r"\1'***'", sql)
+
+def quote_mysql_ident(name):
+    return "`" + name.replace("`", "``") + "`"
+
+def quote_mysql_str(value):
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+def quote_pg_ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def quote_pg_str(value):
+    return "'" + value.replace("'", "''") + "'"
+
+# One admin connection per engine, reused across operations. After a failed
+# connect the CLI is used until ADMIN_RETRY_SECONDS pass, then we try again.
+ADMIN_RETRY_SECONDS = 60
+_admin_conns = {}
+_admin_retry_at = {}
+_admin_locks = {"mariadb": threading.Lock(), "postgres": threading.Lock()}
+
+def _connect_admin(engine):
+    try:
+        if engine == "mariadb" and pymysql:
+            return pymysql.connect(unix_socket=MYSQL_SOCKET, user="root", autocommit=True)
+        if engine == "postgres" and psycopg:
+            conn = psycopg.connect(host=PG_SOCKET_DIR, user="postgres", dbname="postgres")
+            conn.autocommit = True
+            return conn
+    except Exception as e:
+        logging.info(f"Native {engine} admin connection unavailable, using CLI for {ADMIN_RETRY_SECONDS}s: {e}")
+    return None
+
+def _admin_conn(engine):
+    """Return the cached admin connection for an engine, reconnecting if it dropped.
+
+    Returns None while the engine is in its retry delay after a failed connect.
+    """
+    conn = _admin_conns.get(engine)
+    if conn is not None:
+        try:
+            if engine == "mariadb":
+                conn.ping(reconnect=True)
+            elif conn.closed:
+                conn = None
+        except Exception:
+            conn = None
+    if conn is None and time.monotonic() >= _admin_retry_at.get(engine, 0):
+        conn = _connect_admin(engine)
+        if conn is None:
+            _admin_retry_at[engine] = time.monotonic() + ADMIN_RETRY_SECONDS
+    _admin_conns[engine] = conn
+    return conn
+
+def _statements(steps):
+    return [sql for step in steps for sql in ([step] if isinstance(step, str) else step)]
+
+def _sql_secrets(steps):
+    return [m.group(2) for sql in _statements(steps) for m in _SECRET_SQL_RE.finditer(sql)]
+
+def _db_admin_native(conn, engine, steps, force):
+    ok = True
+    for step in steps:
+        statements = [step] if isinstance(step, str) else step
+        # A list is one transaction; MariaDB DDL commits implicitly so it just runs in order
+        in_tx = engine == "postgres" and not isinstance(step, str)
+        try:
+            if in_tx:
+                conn.autocommit = False
+            with conn.cursor() as cur:
+                for sql in statements:
+                    with _sql_span(sql, engine=engine):
+                        cur.execute(sql.strip().rstrip(";"))
+            if in_tx:
+                conn.commit()
+        except Exception as e:
+            if in_tx:
+                conn.rollback()
+            logging.error(f"{engine} admin statement failed: {e}")
+            ok = False
+            if not force:
+                return False
+        finally:
+            if in_tx:
+                conn.autocommit = True
+    return ok
+
+def _db_admin_cli(engine, steps, force):
+    if engine == "mariadb":
+        script = "\n".join(_statements(steps))
+        cmd = ["mysql", "-u", "root", "-e", script]
+        if force:
+            cmd.insert(1, "--force")
+    else:
+        # Each -c is its own transaction; several statements in one -c share one
+        cmd = ['sudo', '-u', 'postgres', 'psql', '-q']
+        if not force:
+            cmd += ['-v', 'ON_ERROR_STOP=1']
+        for step in steps:
+            cmd += ['-c', step if isinstance(step, str) else "\n".join(step)]
+    return run_command(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, secrets=_sql_secrets(steps)).returncode == 0
+
+def db_admin(engine, steps, force=False):
+    """Run admin SQL against 'mariadb' or 'postgres' as the superuser.
+
+    Each step is either a statement, run on its own (needed for CREATE/DROP
+    DATABASE on Postgres), or a list of statements run as one transaction.
+    Uses the pooled native connection when a driver is installed and falls
+    back to a single mysql/psql process otherwise. With force, later steps
+    still run after a failure. Returns True if every step succeeded.
+    """
+    logging.info(f"{engine} admin: " + " ".join(redact_sql(sql) for sql in _statements(steps)))
+    with _admin_locks[engine]:
+        conn = _admin_conn(engine)
+        if conn:
+            return _db_admin_native(conn, engine, steps, force)
+    return _db_admin_cli(engine, steps, force)
+
+@traced
+def create_database(db_type, db_name, db_user, db_pass):
+    if db_type == "mariadb":
+        db, user = quote_mysql_ident(db_name), f"{quote_mysql_str(db_user)}@'%'"
+        return db_admin("mariadb", [[
+            f"CREATE DATABASE IF NOT EXISTS {db};",
+            f"CREATE USER IF NOT EXISTS {user} IDENTIFIED BY {quote_mysql_str(db_pass)};",
+            f"GRANT ALL PRIVILEGES ON {db}.* TO {user};",
+            "FLUSH PRIVILEGES;"
+        ]])
+    elif db_type == "postgres":
+        db, user = quote_pg_ident(db_name), quote_pg_ident(db_user)
+        return db_admin("postgres", [
+            [f"CREATE USER {user} WITH PASSWORD {quote_pg_str(db_pass)};"],
+            f"CREATE DATABASE {db} OWNER {user};",
+            [
+                f"REVOKE CONNECT ON DATABASE {db} FROM PUBLIC;",
+                f"GRANT CONNECT ON DATABASE {db} TO {user};",
+                f"GRANT USAGE ON SCHEMA public TO {user};",
+                f"GRANT ALL PRIVILEGES ON SCHEMA public TO {user};"
+            ]
+        ])
+    return False
+
+@traced
+def drop_database(db_type, db_name, db_user):
+    """Kill the user's sessions, then drop the database and user."""
+    if db_type == "mariadb":
+        # KILL USER ends every connection of the user in one statement
+        user = quote_mysql_str(db_user)
+        return db_admin("mariadb", [
+            f"KILL USER {user};",
+            f"DROP DATABASE IF EXISTS {quote_mysql_ident(db_name)};",
+            f"DROP USER IF EXISTS {user}@'%';"
+        ], force=True)
+    elif db_type == "postgres":
+        # Apps created before names were quoted got Postgres' lowercase folding
+        db_names = list(dict.fromkeys([db_name, db_name.lower()]))
+        db_users = ", ".join(quote_pg_str(name) for name in dict.fromkeys([db_user, db_user.lower()]))
+        return db_admin("postgres", [
+            f"""SELECT pg_terminate_backend(pid)
+            FROM pg_stat_activity
+            WHERE (datname IN ({", ".join(quote_pg_str(name) for name in db_names)}) OR usename IN ({db_users}))
+              AND pid <> pg_backend_pid();""",
+            *[f"DROP DATABASE IF EXISTS {quote_pg_ident(name)};" for name in db_names],
+            # Revoke privileges and drop owned objects before removing whichever role exists
+            f"""DO $$
+            DECLARE role_name text;
+            BEGIN
+                FOR role_name IN SELECT rolname FROM pg_roles WHERE rolname IN ({db_users}) LOOP
+                    EXECUTE format('REVOKE ALL PRIVILEGES ON SCHEMA public FROM %I', role_name);
+                    EXECUTE format('DROP OWNED BY %I', role_name);
+                    EXECUTE format('DROP ROLE %I', role_name);
+                END LOOP;
+            END $$;"""
+        ], force=True)
+    return False
+
+def check_db_login(db_type, db_name, db_user, db_pass):
+    """Return True if the app's own credentials can connect to its database."""
+    try:
+        if db_type == "mariadb" and pymysql:
+            pymysql.connect(host="127.0.0.1", user=db_user, password=db_pass, connect_timeout=5).close()
+            return True
+        if db_type == "postgres" and psycopg:
+            psycopg.connect(user=db_user, dbname=db_name, password=db_pass, connect_timeout=5).close()
+            return True
+    except Exception as e:
+        logging.error(f"DB login check for {db_user} failed: {e}")
+        return False
+
+    if db_type == "mariadb":
+        result = run_command(["mysql", "-h", "127.0.0.1", "-u", db_user, f"-p{db_pass}", "-e", "SHOW DATABASES;"], secrets=(db_pass,)).returncode
+    elif db_type == "postgres":
+        env = os.environ.copy()
+        env['PGPASSWORD'] = db_pass
+        result = run_command(["psql", "-U", db_user, "-d", db_name, "-c", "\\l"], env=env).returncode
+    else:
+        result = 1
+    return result == 0
+
+# Matches {name} placeholders; NGINX/JS braces are followed by whitespace so never match
+_PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+# Compiled templates keyed by path: (mtime_ns, size, parts)
+_template_cache = {}
+
+def _find_template(name, app=None):
+    """Per-app template sets in APP_TEMPLATE_DIR/<app>/ override the defaults."""
+    if app:
+        path = os.path.join(APP_TEMPLATE_DIR, app, name)
+        if os.path.exists(path):
+            return path
+    return os.path.join(TEMPLATE_DIR, name)
+
+def _compile_template(path):
+    st = os.stat(path)
+    cached = _template_cache.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    with open(path) as f:
+        # Even indexes are literal text, odd indexes are variable names
+        parts = _PLACEHOLDER_RE.split(f.read())
+    _template_cache[path] = (st.st_mtime_ns, st.st_size, parts)
+    return parts
+
+def render_template(name, variables, app=None):
+    """Render a scaffold template. Unknown placeholders are left as they are."""
+    parts = _compile_template(_find_template(name, app))
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            out.append(part)
+        else:
+            out.append(str(variables[part]) if part in variables else "{" + part + "}")
+    return "".join(out)
+
+def write_file_atomic(path, content, owner=None, mode=0o644):
+    """Write via a temp file in the same directory and rename it into place.
+
+    owner is "user:group" (or just "user") and is applied before the rename,
+    so readers never see a partially written or wrongly owned file.
+    """
+    with span("write", path=path, bytes=len(content)):
+        _write_file_atomic(path, content, owner, mode)
+
+def _write_file_atomic(path, content, owner, mode):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".turboship-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        if owner:
+            user, _, group = owner.partition(":")
+            shutil.chown(tmp_path, user, group or None)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _content_hash(content):
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def _file_hash(path):
+    try:
+        with open(path) as f:
+            return _content_hash(f.read())
+    except OSError:
+        return None
+
+@traced
+def scaffold_file(app, template, path, variables, owner=None, mode=0o644, overwrite=True):
+    """Render a template to path and remember what was written for rescaffold.
+
+    Returns False if the file exists and overwrite is off.
+    """
+    if not overwrite and os.path.exists(path):
+        return False
+    content = render_template(template, variables, app)
+    write_file_atomic(path, content, owner, mode)
+    with closing(db_connect()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO scaffold_files (app, path, template, vars, owner, mode, hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (app, path, template, json.dumps(variables), owner, mode, _content_hash(content))
+        )
+    return True
+
+@traced
+def rescaffold_app(app):
+    """Re-render every template-derived file of an app.
+
+    A file is rewritten only if its rendered hash changed and it still holds
+    what Turboship last wrote; files edited since then are left alone.
+    Returns (updated_paths, skipped_modified_paths).
+    """
+    with closing(db_connect()) as conn, conn:
+        c = conn.cursor()
+        c.execute("SELECT path, template, vars, owner, mode, hash FROM scaffold_files WHERE app = ?", (app,))
+        updated, modified = [], []
+        for path, template, variables, owner, mode, old_hash in c.fetchall():
+            content = render_template(template, json.loads(variables), app)
+            new_hash = _content_hash(content)
+            if new_hash == old_hash:
+                continue
+            if _file_hash(path) != old_hash:
+                modified.append(path)
+                continue
+            write_file_atomic(path, content, owner, mode)
+            c.execute("UPDATE scaffold_files SET hash = ? WHERE app = ? AND path = ?", (new_hash, app, path))
+            updated.append(path)
+    return updated, modified
+
+def rescaffold(apps):
+    """Refresh template-derived files across apps, reloading NGINX once if needed.
+
+    Returns False if an app failed or NGINX rejected the new config.
+    """
+    ok = True
+    nginx_changed = False
+    for app in apps:
+        try:
+            updated, modified = rescaffold_app(app)
+        except Exception as e:
+            logging.error(f"Rescaffold of {app} failed: {e}")
+            print(colored(f"❌ [{app}] Rescaffold failed: {e}", "red"))
+            ok = False
+            continue
+        for path in updated:
+            print(colored(f"✅ [{app}] Updated {path}", "green"))
+            if path.startswith(NGINX_DIR + "/"):
+                nginx_changed = True
+        for path in modified:
+            print(colored(f"⚠️  [{app}] Skipped {path} (modified since it was generated)", "yellow"))
+
+    if nginx_changed and not reload_nginx():
+        print(colored("❌ NGINX configuration test failed. Please check the syntax.", "red"))
+        return False
+    return ok
+
+DB_TYPES = ("mariadb", "postgres")
+
 def prompt_database():
     print(colored("Choose database type:", "cyan"))
     print("1. MariaDB")
@@ -77,8 +666,12 @@ def prompt_database():
     choice = input("Enter choice [1/2]: ").strip()
     return "mariadb" if choice == "1" else "postgres"
 
+_port_lock = threading.Lock()
+# certbot holds a global lock, so concurrent installs and teardowns must take turns
+_certbot_lock = threading.Lock()
+
 def allocate_port():
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_connect()
     c = conn.cursor()
     c.execute("SELECT port FROM apps")
     used_ports = [row[0] for row in c.fetchall()]
@@ -90,13 +683,24 @@ def allocate_port():
         port += 1
     return port
 
-def create_app():
-    app_name = input("Enter app name: ").strip()
+@traced
+def create_app(app_name=None, db_type=None, domain=None):
+    """Provision a new app. Prompts for anything not passed in.
+
+    Returns False if any step failed.
+    """
+    if app_name is None:
+        app_name = input("Enter app name: ").strip()
     if not validate_app_name(app_name):
         print(colored("Invalid app name. Use only letters, numbers, dashes, underscores.", "red"))
-        return
-
-    db_type = prompt_database()
+        return False
+    set_span_app(app_name)
+
+    if db_type is None:
+        db_type = prompt_database()
+    if db_type not in DB_TYPES:
+        print(colored(f"Invalid database type '{db_type}'. Use mariadb or postgres.", "red"))
+        return False
     sftp_user = f"{app_name}_sftp"
     db_user = f"{app_name}_dbu"
     db_pass = generate_password()
@@ -105,33 +709,34 @@ def create_app():
     temp_domain = f"{app_name}.{get_public_ip()}.sslip.io"
     now = datetime.now().isoformat()
 
-    # Save to DB
-    conn = sqlite3.connect(DB_PATH)
-    port = allocate_port()
-    conn.execute(
-        """
-        INSERT INTO apps 
-        (app, temp_domain, real_domain, db_type, db_name, db_user, db_pass, sftp_user, sftp_pass, port, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (app_name, temp_domain, None, db_type, db_name, db_user, db_pass, sftp_user, sftp_pass, port, now)
-    )
-    conn.commit()
-    conn.close()
+    # Save to DB; the lock keeps concurrent creates from picking the same port
+    with _port_lock, closing(db_connect()) as conn, conn:
+        if conn.execute("SELECT 1 FROM apps WHERE app = ?", (app_name,)).fetchone():
+            print(colored(f"❌ App '{app_name}' already exists.", "red"))
+            return False
+        port = allocate_port()
+        conn.execute(
+            """
+            INSERT INTO apps 
+            (app, temp_domain, real_domain, db_type, db_name, db_user, db_pass, sftp_user, sftp_pass, port, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (app_name, temp_domain, domain or None, db_type, db_name, db_user, db_pass, sftp_user, sftp_pass, port, now)
+        )
 
-    # Ensure /var/www exists
-    os.makedirs("/var/www", exist_ok=True)
+    # Ensure BASE_DIR exists
+    os.makedirs(BASE_DIR, exist_ok=True)
 
     # App paths
-    app_root = f"/var/www/{app_name}"
+    app_root = os.path.join(BASE_DIR, app_name)
     app_path = os.path.join(app_root, "htdocs")
     logs_path = os.path.join(app_root, "logs")
     api_path = os.path.join(app_root, "api")
 
     # Create SSH+SFTP user
-    if subprocess.run(["id", "-u", sftp_user], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode != 0:
-        os.system(f"useradd -m -d {app_root} -s /bin/bash {sftp_user}")
-        subprocess.run(["bash", "-c", f"echo '{sftp_user}:{sftp_pass}' | chpasswd"])
+    if run_command(["id", "-u", sftp_user], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode != 0:
+        run_shell(f"useradd -m -d {app_root} -s /bin/bash {sftp_user}")
+        run_command(["bash", "-c", f"echo '{sftp_user}:{sftp_pass}' | chpasswd"], secrets=(sftp_pass,))
     else:
         print(colored(f"User {sftp_user} already exists. Skipping user creation.", "yellow"))
 
@@ -141,232 +746,129 @@ def create_app():
     os.makedirs(logs_path, exist_ok=True)
 
     # Add user to www-data group
-    os.system(f"usermod -aG www-data {sftp_user}")
+    run_shell(f"usermod -aG www-data {sftp_user}")
 
     # Ownership & permissions
-    os.system(f"chown -R {sftp_user}:www-data {app_root}")
-    os.system(f"chmod -R g+rwX {app_root}")
-    os.system(f"chmod g+s {app_root}")
+    run_shell(f"chown -R {sftp_user}:www-data {app_root}")
+    run_shell(f"chmod -R g+rwX {app_root}")
+    run_shell(f"chmod g+s {app_root}")
+
+    run_shell(f"chmod 775 {app_path} && chmod g+s {app_path}")
+    run_shell(f"chmod 775 {api_path} && chmod g+s {api_path}")
 
-    os.system(f"chmod 775 {app_path} && chmod g+s {app_path}")
-    os.system(f"chmod 775 {api_path} && chmod g+s {api_path}")
+    run_shell(f"chown -R www-data:www-data {logs_path}")
+    run_shell(f"chmod -R 755 {logs_path}")
 
-    os.system(f"chown -R www-data:www-data {logs_path}")
-    os.system(f"chmod -R 755 {logs_path}")
+    variables = {"app_name": app_name, "app_root": app_root, "api_path": api_path, "port": port}
 
-    # Ensure umask in .bashrc
+    # Ensure umask in .bashrc. useradd -m normally copied the skeleton one, so the
+    # block is appended once and not tracked for rescaffold
     bashrc_path = os.path.join(app_root, ".bashrc")
-    if not os.path.exists(bashrc_path):
-        with open(bashrc_path, "w") as f:
-            f.write("\n# Turboship defaults\numask 002\n")
-    else:
+    if not scaffold_file(app_name, "bashrc", bashrc_path, variables, owner=f"{sftp_user}:{sftp_user}", overwrite=False):
         with open(bashrc_path, "r+") as f:
             content = f.read()
             if "umask 002" not in content:
-                f.write("\n# Turboship defaults\numask 002\n")
-    os.system(f"chown {sftp_user}:{sftp_user} {bashrc_path}")
+                with span("write", path=bashrc_path, mode="append"):
+                    f.write(render_template("bashrc", variables, app_name))
 
     # PM2 config
     pm2_config_path = os.path.join(app_root, "pm2.config.js")
-    cwd_path = api_path
-    if not os.path.exists(pm2_config_path):
-        with open(pm2_config_path, "w") as f:
-            f.write(f"""module.exports = {{
-    apps: [
-        {{
-            name: "{app_name}-backend",
-            script: "npm start",
-            cwd: "{cwd_path}",
-            watch: false,
-            env: {{
-                NODE_ENV: "production",
-                PORT: {port}
-            }}
-        }}
-    ]
-}};""")
-    os.system(f"chown {sftp_user}:www-data {pm2_config_path}")
-    os.system(f"chmod 644 {pm2_config_path}")
+    scaffold_file(app_name, "pm2.config.js", pm2_config_path, variables, owner=f"{sftp_user}:www-data", overwrite=False)
 
     # Landing page
-    landing_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "landing_template.html")
-    if os.path.exists(landing_path):
-        index_target = os.path.join(app_path, "index.html")
-        if not os.path.exists(index_target):
-            with open(landing_path) as src, open(index_target, "w") as dst:
-                dst.write(src.read().replace("{app_name}", app_name))
-            os.system(f"chown {sftp_user}:www-data {index_target}")
-            os.system(f"chmod 644 {index_target}")
+    index_target = os.path.join(app_path, "index.html")
+    scaffold_file(app_name, "landing.html", index_target, variables, owner=f"{sftp_user}:www-data", overwrite=False)
 
     # Database setup
-    if db_type == "mariadb":
-        sql = f"""
-            CREATE DATABASE IF NOT EXISTS {db_name};
-            CREATE USER IF NOT EXISTS '{db_user}'@'%' IDENTIFIED BY '{db_pass}';
-            GRANT ALL PRIVILEGES ON {db_name}.* TO '{db_user}'@'%';
-            FLUSH PRIVILEGES;
-        """
-        subprocess.run(["mysql", "-u", "root", "-e", sql])
-    elif db_type == "postgres":
-        for cmd in [
-            f"CREATE USER {db_user} WITH PASSWORD '{db_pass}';",
-            f"CREATE DATABASE {db_name} OWNER {db_user};",
-            f"REVOKE CONNECT ON DATABASE {db_name} FROM PUBLIC;",
-            f"GRANT CONNECT ON DATABASE {db_name} TO {db_user};",
-            f"GRANT USAGE ON SCHEMA public TO {db_user};",
-            f"GRANT ALL PRIVILEGES ON SCHEMA public TO {db_user};"
-        ]:
-            subprocess.run(['sudo', '-u', 'postgres', 'psql', '-c', cmd])
+    ok = create_database(db_type, db_name, db_user, db_pass)
+    if not ok:
+        print(colored(f"❌ Failed to set up {db_type} database '{db_name}'. See {LOG_FILE}.", "red"))
 
     # Configure Nginx
-    configure_nginx(app_name, [temp_domain], api_path)
-    install_ssl(app_name)
+    ok = configure_nginx(app_name, [temp_domain, domain] if domain else [temp_domain], api_path) and ok
+    ok = install_ssl(app_name) and ok
 
     # Final info
     info_app(app_name)
+    return ok
 #
+@traced
 def configure_nginx(app, domains, api_path=None):
     if isinstance(domains, str):
         domains = [domains]
 
     server_names = " ".join(domains)
     # Directory matches create_app() (no _sftp suffix)
-    root_path = f"/var/www/{app}/htdocs"
+    root_path = os.path.join(BASE_DIR, app, "htdocs")
 
     # Get the allocated port for the app
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_connect()
     c = conn.cursor()
     c.execute("SELECT port FROM apps WHERE app = ?", (app,))
     row = c.fetchone()
     conn.close()
     if not row:
         print(colored(f"❌ App '{app}' not found in DB.", "red"))
-        return
+        return False
     port = row[0]
 
     # Generate NGINX configuration (HTTP only). SSL block (443) added later by install_ssl.
-    if api_path is None:
-        conf = f"""
-server {{
-    listen 80;
-    server_name {server_names};
-
-    location ^~ /.well-known/acme-challenge/ {{
-        allow all;
-        default_type "text/plain";
-        root {root_path};
-    }}
-
-    location / {{
-        proxy_pass http://localhost:{port};
-        proxy_http_version 1.1;
-        proxy_set_header Upgrade $http_upgrade;
-        proxy_set_header Connection 'upgrade';
-        proxy_set_header Host $host;
-        proxy_set_header X-Real-IP $remote_addr;
-        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
-        proxy_set_header X-Forwarded-Proto $scheme;
-        proxy_cache_bypass $http_upgrade;
-    }}
-}}
-"""
-    else:
-        uploads_alias = f"/var/www/{app}/api/uploads/"
-        conf = f"""
-server {{
-    listen 80;
-    server_name {server_names};
-
-    root {root_path};
-    index index.html;
-
-    location ^~ /.well-known/acme-challenge/ {{
-        allow all;
-        default_type "text/plain";
-        root {root_path};
-    }}
-
-    location /api/ {{
-        proxy_pass http://localhost:{port}/api/;
-        proxy_http_version 1.1;
-        proxy_set_header Upgrade $http_upgrade;
-        proxy_set_header Connection 'upgrade';
-        proxy_set_header Host $host;
-        proxy_set_header X-Real-IP $remote_addr;
-        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
-        proxy_set_header X-Forwarded-Proto $scheme;
-        proxy_cache_bypass $http_upgrade;
-        proxy_connect_timeout 300s;
-        proxy_send_timeout 300s;
-        proxy_read_timeout 300s;
-        send_timeout 300s;
-    }}
-
-    location /uploads/ {{
-        alias {uploads_alias};
-        autoindex on;
-        add_header Access-Control-Allow-Origin *;
-        add_header Accept-Ranges bytes;
-        try_files $uri =404;
-    }}
-
-    location / {{
-        try_files $uri /index.html;
-    }}
-
-    add_header X-Frame-Options "SAMEORIGIN";
-    add_header X-Content-Type-Options "nosniff";
-    add_header X-XSS-Protection "1; mode=block";
-}}
-"""
+    variables = {
+        "app_name": app,
+        "server_names": server_names,
+        "root_path": root_path,
+        "uploads_alias": os.path.join(BASE_DIR, app, "api", "uploads") + "/",
+        "port": port
+    }
+    template = "nginx_http.conf" if api_path is None else "nginx_app.conf"
 
     # Use app name for NGINX configuration file
-    path = f"/etc/nginx/sites-available/{app}"
+    path = os.path.join(NGINX_DIR, "sites-available", app)
     try:
-        with open(path, "w") as f:
-            f.write(conf)
+        scaffold_file(app, template, path, variables)
     except Exception as e:
         print(colored(f"❌ Failed to write NGINX config for {app}: {e}", "red"))
-        return
+        return False
 
     # Create symlink in sites-enabled
-    symlink = f"/etc/nginx/sites-enabled/{app}"
+    symlink = os.path.join(NGINX_DIR, "sites-enabled", app)
     try:
         if not os.path.exists(symlink):
             os.symlink(path, symlink)
     except Exception as e:
         print(colored(f"❌ Failed to create NGINX symlink for {app}: {e}", "red"))
-        return
+        return False
 
     # Create .well-known directory for SSL challenges
     try:
         os.makedirs(os.path.join(root_path, ".well-known/acme-challenge/"), exist_ok=True)
     except Exception as e:
         print(colored(f"❌ Failed to create .well-known directory for {app}: {e}", "red"))
-        return
+        return False
 
     # Test and reload NGINX
     try:
-        result = os.system("nginx -t && systemctl reload nginx")
-        if result != 0:
+        if not reload_nginx():
             print(colored("❌ NGINX configuration test failed. Please check the syntax.", "red"))
-            os.system("nginx -t")  # Show detailed errors
+            run_shell("nginx -t")  # Show detailed errors
             exit(1)
     except Exception as e:
         print(colored(f"❌ Failed to reload NGINX: {e}", "red"))
-        return
+        return False
+    return True
 
 
+@traced
 def install_ssl(app):
     """Issue SSL via certbot for all domains and write final 443/80 nginx config."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_connect()
     c = conn.cursor()
     c.execute("SELECT temp_domain, real_domain FROM apps WHERE app = ?", (app,))
     row = c.fetchone()
     if not row:
         print(colored(f"❌ App '{app}' not found in DB.", "red"))
         conn.close()
-        return
+        return False
 
     temp_domain, real_domain = row
     domains = [temp_domain]
@@ -388,73 +890,22 @@ def install_ssl(app):
         f"sudo certbot --nginx --non-interactive --agree-tos {domain_flags} "
         f"-m admin@{temp_domain} --redirect --expand"
     )
-    result = os.system(certbot_command)
+    with _certbot_lock:
+        result = run_shell(certbot_command)
     if result != 0:
-        os.system("nginx -t")
+        run_shell("nginx -t")
         conn.close()
-        return
+        return False
 
     # Build final nginx config (SSL server and HTTP redirect server)
     c.execute("SELECT port FROM apps WHERE app = ?", (app,))
     prow = c.fetchone()
     port = prow[0] if prow else 3000
     primary = domains[0]
-    root_path = f"/var/www/{app}/htdocs"
-    uploads_alias = f"/var/www/{app}/api/uploads/"
+    root_path = os.path.join(BASE_DIR, app, "htdocs")
+    uploads_alias = os.path.join(BASE_DIR, app, "api", "uploads") + "/"
     server_names = " ".join(domains)
 
-    ssl_conf = f"""
-server {{
-    server_name {server_names};
-
-    root {root_path};
-    index index.html;
-
-    location ^~ /.well-known/acme-challenge/ {{
-        allow all;
-        default_type "text/plain";
-        root {root_path};
-    }}
-
-    location /api/ {{
-        proxy_pass http://localhost:{port}/api/;
-        proxy_http_version 1.1;
-        proxy_set_header Upgrade $http_upgrade;
-        proxy_set_header Connection 'upgrade';
-        proxy_set_header Host $host;
-        proxy_set_header X-Real-IP $remote_addr;
-        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
-        proxy_set_header X-Forwarded-Proto $scheme;
-        proxy_cache_bypass $http_upgrade;
-        proxy_connect_timeout 300s;
-        proxy_send_timeout 300s;
-        proxy_read_timeout 300s;
-        send_timeout 300s;
-    }}
-
-    location /uploads/ {{
-        alias {uploads_alias};
-        autoindex on;
-        add_header Access-Control-Allow-Origin *;
-        add_header Accept-Ranges bytes;
-        try_files $uri =404;
-    }}
-
-    location / {{
-        try_files $uri /index.html;
-    }}
-
-    add_header X-Frame-Options "SAMEORIGIN";
-    add_header X-Content-Type-Options "nosniff";
-    add_header X-XSS-Protection "1; mode=block";
-    listen 443 ssl; # managed by Certbot
-    ssl_certificate /etc/letsencrypt/live/{primary}/fullchain.pem; # managed by Certbot
-    ssl_certificate_key /etc/letsencrypt/live/{primary}/privkey.pem; # managed by Certbot
-    include /etc/letsencrypt/options-ssl-nginx.conf; # managed by Certbot
-    ssl_dhparam /etc/letsencrypt/ssl-dhparams.pem; # managed by Certbot
-}}
-"""
-
     # HTTP redirect block with per-host rules (www -> apex)
     redirect_block = ""
     for d in domains:
@@ -468,37 +919,42 @@ server {{
                 f"    if ($host = {d}) {{\n        return 301 https://$host$request_uri;\n    }} # managed by Certbot\n\n"
             )
 
-    ssl_conf += f"""
-server {{
-{redirect_block}    listen 80;
-    server_name {server_names};
-    return 301 https://$host$request_uri;
-}}
-"""
-
-    path = f"/etc/nginx/sites-available/{app}"
+    variables = {
+        "app_name": app,
+        "server_names": server_names,
+        "root_path": root_path,
+        "uploads_alias": uploads_alias,
+        "port": port,
+        "primary": primary,
+        "redirect_block": redirect_block
+    }
+
+    path = os.path.join(NGINX_DIR, "sites-available", app)
     try:
-        with open(path, "w") as f:
-            f.write(ssl_conf)
-        os.system("nginx -t && systemctl reload nginx")
+        scaffold_file(app, "nginx_ssl.conf", path, variables)
+        ok = reload_nginx()
     except Exception as e:
         print(colored(f"❌ Failed to write SSL nginx config: {e}", 'red'))
+        ok = False
 
     conn.close()
+    return ok
 
+@traced
 def test_app(app):
-    """Basic health checks for domains and DB connectivity."""
-    conn = sqlite3.connect(DB_PATH)
+    """Basic health checks for domains and DB connectivity. Returns False if any failed."""
+    conn = db_connect()
     c = conn.cursor()
     c.execute("SELECT temp_domain, real_domain, db_type, db_name, db_user, db_pass, sftp_user, sftp_pass FROM apps WHERE app = ?", (app,))
     row = c.fetchone()
     if not row:
         print(colored("❌ App not found.", "red"))
         conn.close()
-        return
+        return False
 
     temp_domain, real_domain, db_type, db_name, db_user, db_pass, sftp_user, sftp_pass = row
     print(colored(f"\nTesting app '{app}':", "cyan"))
+    ok = True
 
     for domain in filter(None, [temp_domain, real_domain]):
         print(f"🌐 Testing domain: {domain}")
@@ -507,147 +963,227 @@ def test_app(app):
             print(colored("✅ DNS Resolved", "green"))
         except Exception:
             print(colored("❌ DNS failed", "red"))
+            ok = False
 
-    if db_type == "mariadb":
-        result = subprocess.call(["mysql", "-h", "127.0.0.1", "-u", db_user, f"-p{db_pass}", "-e", "SHOW DATABASES;"])
-    elif db_type == "postgres":
-        env = os.environ.copy()
-        env['PGPASSWORD'] = db_pass
-        result = subprocess.call(["psql", "-U", db_user, "-d", db_name, "-c", "\\l"], env=env)
-    else:
-        result = 1
+    result = 0 if check_db_login(db_type, db_name, db_user, db_pass) else 1
 
     print(colored("✅ DB Connection OK" if result == 0 else "❌ DB Connection Failed", "green" if result == 0 else "red"))
 
     conn.close()
+    return ok and result == 0
 
+APP_COLUMNS = ["app", "temp_domain", "real_domain", "db_type", "db_name", "db_user", "db_pass",
+               "sftp_user", "sftp_pass", "port", "created_at"]
+LIST_COLUMNS = ["app", "temp_domain", "real_domain", "db_type", "db_name", "db_user", "sftp_user", "port", "created_at"]
+
+@traced
 def list_apps():
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_connect()
     c = conn.cursor()
-    c.execute("SELECT app, temp_domain, real_domain, db_type, db_name, db_user, sftp_user, port, created_at FROM apps")
-    rows = c.fetchall()
-    headers = ["App", "Temp Domain", "Real Domain", "DB Type", "DB Name", "DB User", "SFTP User", "API Port", "Created At"]
-    print(tabulate(rows, headers=headers, tablefmt="fancy_grid"))
+    c.execute(f"SELECT {', '.join(LIST_COLUMNS)} FROM apps")
+    print_app_table(c.fetchall())
     conn.close()
 
-def delete_app(app):
-    confirm = input(colored(f"⚠️ Are you sure you want to delete '{app}' and all its resources? (yes/no): ", "red"))
-    if confirm.lower() != "yes":
-        print("❌ Aborted.")
-        return
-
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT temp_domain, real_domain, db_type, db_name, db_user, sftp_user FROM apps WHERE app = ?", (app,))
-    row = c.fetchone()
-    if not row:
-        print(colored(f"❌ App '{app}' not found.", "red"))
-        return
-
-    temp_domain, real_domain, db_type, db_name, db_user, sftp_user = row
-    domains = [temp_domain]
-    if real_domain:
-        domains.append(real_domain)
-
-    app_root = f"/var/www/{app}"
+def print_app_table(rows):
+    headers = ["App", "Temp Domain", "Real Domain", "DB Type", "DB Name", "DB User", "SFTP User", "API Port", "Created At"]
+    print(tabulate(rows, headers=headers, tablefmt="fancy_grid"))
 
-    # ---- Stop PM2 process(es) for this app ----
+TEARDOWN_WORKERS = 8
+TRASH_DIR = os.path.join(BASE_DIR, ".turboship-trash")
+
+def _wait_for_user_exit(user, timeout=5.0, interval=0.1):
+    """Poll until no processes are left for a user. Returns True if they all exited."""
+    deadline = time.monotonic() + timeout
+    while _run_quiet(["pgrep", "-u", user]) == 0:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+@traced
+def _stop_app_processes(app, sftp_user):
+    """Stop PM2 and terminate every process owned by the app user."""
     pm2_name = f"{app}-backend"
-    print(colored("⏹  Stopping PM2 process...", "yellow"))
-    # Try as root (if PM2 was run as root)
-    os.system(f"pm2 delete {pm2_name} >/dev/null 2>&1")
-    # Try as the app user (common case)
-    os.system(f"sudo -u {sftp_user} pm2 delete {pm2_name} >/dev/null 2>&1")
-    # Optional: remove saved dump entries
-    os.system("pm2 save >/dev/null 2>&1 || true")
-    os.system(f"sudo -u {sftp_user} pm2 save >/dev/null 2>&1 || true")    
-
-    # ---- Terminate active sessions/processes (SSH, app, etc.) ----
-    print(colored("⏹  Terminating user processes (SSH / app)...", "yellow"))
+    print(colored(f"⏹  [{app}] Stopping PM2 process...", "yellow"))
+    # Root and app-user PM2 daemons are independent, so delete + save on both at once
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        _submit(pool, _run_quiet, ["bash", "-c", f"pm2 delete {pm2_name}; pm2 save"])
+        _submit(pool, _run_quiet, ["sudo", "-u", sftp_user, "bash", "-c", f"pm2 delete {pm2_name}; pm2 save"])
+
+    print(colored(f"⏹  [{app}] Terminating user processes (SSH / app)...", "yellow"))
     # Try systemd-logind first (if available), fallback to pkill
-    if os.system(f"loginctl terminate-user {sftp_user} >/dev/null 2>&1") != 0:
-        os.system(f"pkill -TERM -u {sftp_user} >/dev/null 2>&1")
-        # Brief grace period
-        os.system("sleep 1")
-        os.system(f"pkill -KILL -u {sftp_user} >/dev/null 2>&1")
+    if _run_quiet(["loginctl", "terminate-user", sftp_user]) != 0:
+        _run_quiet(["pkill", "-TERM", "-u", sftp_user])
+    # Grace period ends as soon as everything has exited
+    if not _wait_for_user_exit(sftp_user):
+        _run_quiet(["pkill", "-KILL", "-u", sftp_user])
+        _wait_for_user_exit(sftp_user, timeout=2.0)
+
+def _move_to_trash(app_root):
+    """Atomically move an app root out of the way. Returns the new path or None."""
+    if not os.path.exists(app_root):
+        return None
+    os.makedirs(TRASH_DIR, exist_ok=True)
+    trash_path = os.path.join(TRASH_DIR, f"{os.path.basename(app_root)}-{time.time_ns()}")
+    try:
+        # Same filesystem, so this is a single rename rather than a copy
+        os.rename(app_root, trash_path)
+    except OSError as e:
+        logging.error(f"Failed to move {app_root} to trash: {e}")
+        run_command(["rm", "-rf", app_root], stderr=subprocess.DEVNULL)
+        return None
+    return trash_path
+
+def _reclaim_trash(paths):
+    """Remove trashed app roots in a detached process that outlives this one.
+
+    Anything else still in TRASH_DIR (e.g. an earlier rm was killed by a
+    reboot) is swept up in the same run.
+    """
+    paths = {p for p in paths if p}
+    if os.path.isdir(TRASH_DIR):
+        paths.update(os.path.join(TRASH_DIR, entry) for entry in os.listdir(TRASH_DIR))
+    paths = sorted(paths)
+    if not paths:
+        return
+    logging.info(f"Reclaiming in background: {' '.join(paths)}")
+    with span("exec rm (background)", cmd=f"rm -rf {' '.join(paths)}"):
+        subprocess.Popen(
+            ["nice", "-n", "19", "rm", "-rf", "--", *paths],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
 
-    # ---- Terminate DB connections for this app before drop ----
-    if db_type == "mariadb":
-        print(colored("⏹  Terminating MariaDB sessions...", "yellow"))
-        # Collect connection IDs for this DB user
-        try:
-            ids = subprocess.check_output(
-                ["mysql", "-N", "-u", "root", "-e",
-                 f"SELECT ID FROM information_schema.PROCESSLIST WHERE USER='{db_user}';"]
-            ).decode().strip().splitlines()
-            for cid in ids:
-                if cid.isdigit():
-                    os.system(f"mysql -u root -e 'KILL {cid};' >/dev/null 2>&1")
-        except Exception:
-            pass
-    elif db_type == "postgres":
-        print(colored("⏹  Terminating PostgreSQL sessions...", "yellow"))
-        terminate_sql = f"""
-            SELECT pg_terminate_backend(pid)
-            FROM pg_stat_activity
-            WHERE (datname = '{db_name}' OR usename = '{db_user}')
-              AND pid <> pg_backend_pid();
-        """
-        subprocess.run(['sudo', '-u', 'postgres', 'psql', '-c', terminate_sql], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+def _drop_database(app, db_type, db_name, db_user):
+    label = {"mariadb": "MariaDB", "postgres": "PostgreSQL"}.get(db_type)
+    if label:
+        print(colored(f"⏹  [{app}] Terminating {label} sessions and dropping database...", "yellow"))
+        drop_database(db_type, db_name, db_user)
 
-    # ---- Drop database & user ----
-    if db_type == "mariadb":
-        sql = f"""
-        DROP DATABASE IF EXISTS {db_name};
-        DROP USER IF EXISTS '{db_user}'@'%';
-        """
-        subprocess.run(["mysql", "-u", "root", "-e", sql])
-    elif db_type == "postgres":
-        # Drop DB first
-        subprocess.run(['sudo', '-u', 'postgres', 'psql', '-c', f"DROP DATABASE IF EXISTS {db_name};"])
-
-        # Revoke privileges and drop owned objects before removing the role
-        subprocess.run(['sudo', '-u', 'postgres', 'psql', '-c', f"REVOKE ALL PRIVILEGES ON SCHEMA public FROM {db_user};"])
-        subprocess.run(['sudo', '-u', 'postgres', 'psql', '-c', f"DROP OWNED BY {db_user};"])
-        
-        # Now drop the role
-        subprocess.run(['sudo', '-u', 'postgres', 'psql', '-c', f"DROP ROLE IF EXISTS {db_user};"])
-
-    # Remove Linux user (after processes killed)
-    subprocess.run(["userdel", "-r", sftp_user], stderr=subprocess.DEVNULL)
-
-    # Remove Nginx config
-    nginx_path = f"/etc/nginx/sites-available/{app}"
-    nginx_symlink = f"/etc/nginx/sites-enabled/{app}"
-    if os.path.exists(nginx_symlink):
+def _remove_nginx_config(app):
+    nginx_path = os.path.join(NGINX_DIR, "sites-available", app)
+    nginx_symlink = os.path.join(NGINX_DIR, "sites-enabled", app)
+    if os.path.lexists(nginx_symlink):
         os.remove(nginx_symlink)
     if os.path.exists(nginx_path):
         os.remove(nginx_path)
-    os.system("nginx -t && systemctl reload nginx")
 
-    # Remove SSL certificates
+@traced
+def _delete_certificates(domains):
     for domain in domains:
-        subprocess.run(["certbot", "delete", "--cert-name", domain, "--non-interactive"], input=b'y\n')
+        # Only the first domain of an app owns a certificate; skip certbot for the rest
+        if not os.path.exists(os.path.join(LETSENCRYPT_DIR, "renewal", f"{domain}.conf")):
+            continue
+        with _certbot_lock:
+            run_command(["certbot", "delete", "--cert-name", domain, "--non-interactive"],
+                           input=b'y\n', stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+@traced
+def _teardown_app(app, row):
+    """Remove all resources of one app, running independent steps concurrently.
+
+    Returns the trash path of the app root so the caller can reclaim it.
+    NGINX is not reloaded here so batch deletes can reload once.
+    """
+    temp_domain, real_domain, db_type, db_name, db_user, sftp_user = row
+    domains = [temp_domain]
+    if real_domain:
+        domains.append(real_domain)
 
-    # Remove DB record
-    c.execute("DELETE FROM apps WHERE app = ?", (app,))
-    conn.commit()
+    app_root = os.path.join(BASE_DIR, app)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        cert_future = _submit(pool, _delete_certificates, domains)
+        _remove_nginx_config(app)
+        _stop_app_processes(app, sftp_user)
+        # Drop the DB only once the app is stopped, so nothing reconnects between
+        # terminating its sessions and DROP DATABASE
+        db_future = _submit(pool, _drop_database, app, db_type, db_name, db_user)
+        # Move the root aside before userdel so it does not delete the tree synchronously
+        trash_path = _move_to_trash(app_root)
+        run_command(["userdel", "-r", sftp_user], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        db_future.result()
+        cert_future.result()
+    return trash_path
+
+def _delete_app_records(apps):
+    with closing(db_connect()) as conn, conn:
+        conn.executemany("DELETE FROM apps WHERE app = ?", [(app,) for app in apps])
+        conn.executemany("DELETE FROM scaffold_files WHERE app = ?", [(app,) for app in apps])
+
+def confirm_delete(app):
+    answer = input(colored(f"⚠️ Are you sure you want to delete '{app}' and all its resources? (yes/no): ", "red"))
+    return answer.lower() == "yes"
+
+@traced
+def delete_app(app, confirm=True):
+    if confirm and not confirm_delete(app):
+        print("❌ Aborted.")
+        return False
+
+    conn = db_connect()
+    c = conn.cursor()
+    c.execute("SELECT temp_domain, real_domain, db_type, db_name, db_user, sftp_user FROM apps WHERE app = ?", (app,))
+    row = c.fetchone()
     conn.close()
+    if not row:
+        print(colored(f"❌ App '{app}' not found.", "red"))
+        return False
 
-    # Remove the app's root directory
-    if os.path.exists(app_root):
-        subprocess.run(["rm", "-rf", app_root], stderr=subprocess.DEVNULL)
+    trash_path = _teardown_app(app, row)
+    reload_nginx()
+    _delete_app_records([app])
+    _reclaim_trash([trash_path])
 
     print(colored(f"✅ App '{app}' deleted successfully.", "green"))
+    return True
 
-def map_domain(app, new_domain):
-    conn = sqlite3.connect(DB_PATH)
+@traced
+def delete_matching_apps(pattern):
+    """Delete every app whose name matches a shell-style pattern, in parallel."""
+    conn = db_connect()
     c = conn.cursor()
-    c.execute("SELECT temp_domain FROM apps WHERE app = ?", (app,))
-    row = c.fetchone()
+    c.execute("SELECT app, temp_domain, real_domain, db_type, db_name, db_user, sftp_user FROM apps")
+    rows = {r[0]: r[1:] for r in c.fetchall() if fnmatch.fnmatchcase(r[0], pattern)}
+    conn.close()
+    if not rows:
+        print(colored(f"❌ No apps match '{pattern}'.", "red"))
+        return False
+
+    print(colored(f"Apps matching '{pattern}': {', '.join(sorted(rows))}", "cyan"))
+    confirm = input(colored(f"⚠️ Are you sure you want to delete these {len(rows)} apps and all their resources? (yes/no): ", "red"))
+    if confirm.lower() != "yes":
+        print("❌ Aborted.")
+        return False
+
+    deleted, trash_paths = [], []
+    with ThreadPoolExecutor(max_workers=TEARDOWN_WORKERS) as pool:
+        futures = {_submit(pool, _teardown_app, app, row): app for app, row in rows.items()}
+        for future in as_completed(futures):
+            app = futures[future]
+            try:
+                trash_paths.append(future.result())
+                deleted.append(app)
+            except Exception as e:
+                logging.error(f"Teardown of {app} failed: {e}")
+                print(colored(f"❌ Failed to delete '{app}': {e}", "red"))
+
+    # One reload for the whole batch
+    reload_nginx()
+    if deleted:
+        _delete_app_records(deleted)
+    _reclaim_trash(trash_paths)
+
+    print(colored(f"✅ Deleted {len(deleted)} of {len(rows)} apps.", "green"))
+    return len(deleted) == len(rows)
+
+@traced
+def map_domain(app, new_domain):
+    with closing(db_connect()) as conn:
+        row = conn.execute("SELECT temp_domain FROM apps WHERE app = ?", (app,)).fetchone()
     if not row:
         print(colored(f"❌ App '{app}' not found in DB.", "red"))
-        return
+        return False
 
     temp_domain = row[0]
     domains = [temp_domain]
@@ -655,27 +1191,34 @@ def map_domain(app, new_domain):
         domains.append(new_domain)
 
     # Update nginx and certbot
-    configure_nginx(app, domains)
+    ok = configure_nginx(app, domains)
 
     # Install SSL for the app
-    install_ssl(app)
+    ok = install_ssl(app) and ok
 
     # Update DB
-    c.execute("UPDATE apps SET real_domain = ? WHERE app = ?", (new_domain, app))
-    conn.commit()
-    conn.close()
+    with closing(db_connect()) as conn, conn:
+        conn.execute("UPDATE apps SET real_domain = ? WHERE app = ?", (new_domain, app))
 
+    if not ok:
+        print(colored(f"❌ Domain for '{app}' set to '{new_domain}', but NGINX/SSL setup failed.", "red"))
+        return False
     print(colored(f"✅ Domain for '{app}' updated to '{new_domain}'", "green"))
+    return True
 
+@traced
 def info_app(app):
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_connect()
     c = conn.cursor()
-    c.execute("SELECT * FROM apps WHERE app = ?", (app,))
+    c.execute(f"SELECT {', '.join(APP_COLUMNS)} FROM apps WHERE app = ?", (app,))
     row = c.fetchone()
+    conn.close()
     if not row:
         print(colored(f"❌ App '{app}' not found.", "red"))
         return
+    print_app_info(row)
 
+def print_app_info(row):
     app_name, temp_domain, real_domain, db_type, db_name, db_user, db_pass, sftp_user, sftp_pass, port, created_at = row
 
     print(colored(figlet_format("Turboship"), "green"))
@@ -692,15 +1235,543 @@ def info_app(app):
     print(f"  🔌 API Port     : {port}")
     print(f"  🕒 Created At   : {created_at}\n")
 
+# ---- Daemon (turboship serve) ----
+SOCKET_PATH = os.getenv("TURBOSHIP_SOCKET", "/run/turboship.sock")
+SERVE_WORKERS = 4
+NGINX_RELOAD_WINDOW = 0.5
+# Operations that change the host go through the job queue; list/info are plain reads
+JOB_OPS = {
+    "create": ("app", "db_type"),
+    "test": ("app",),
+    "delete": ("app",),
+    # Without a domain, map-domain clears the app's real domain
+    "map-domain": ("app",),
+    "rescaffold": ("app",),
+}
+FINISHED_STATUSES = ("done", "failed")
+
+class NginxReloadBatcher:
+    """Coalesce NGINX reloads requested by concurrent jobs.
+
+    The first caller waits NGINX_RELOAD_WINDOW seconds for others to join,
+    then does one reload for everyone who asked before it started. Each
+    caller still returns only after a reload that covers its own changes.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.cond = threading.Condition()
+        self.requested = 0
+        self.completed = 0
+        self.leader = False
+        self.last_ok = True
+
+    def reload(self):
+        with self.cond:
+            self.requested += 1
+            ticket = self.requested
+            while self.completed < ticket:
+                if self.leader:
+                    self.cond.wait()
+                    continue
+                self.leader = True
+                covered, ok = ticket, False
+                self.cond.release()
+                try:
+                    time.sleep(self.window)
+                    with self.cond:
+                        covered = self.requested
+                    ok = _reload_nginx_now()
+                finally:
+                    # Even if the reload raised, release the waiters with a failure
+                    self.cond.acquire()
+                    self.leader = False
+                    self.completed = max(self.completed, covered)
+                    self.last_ok = ok
+                    self.cond.notify_all()
+            return self.last_ok
+
+# Bumped whenever a job writes output or finishes, so streams wait instead of polling
+_job_changes = collections.Counter()
+_job_changed = threading.Condition()
+
+def _notify_job(job_id):
+    with _job_changed:
+        _job_changes[job_id] += 1
+        _job_changed.notify_all()
+
+# Per-job output sink; copied into teardown threads by _submit()
+_job_sink = contextvars.ContextVar("turboship_job_sink", default=None)
+
+class _JobStdout(io.TextIOBase):
+    """sys.stdout for the daemon: output of a job goes to its job_output rows."""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def write(self, text):
+        sink = _job_sink.get()
+        if sink is None:
+            return self.fallback.write(text)
+        sink.write(text)
+        return len(text)
+
+    def flush(self):
+        self.fallback.flush()
+
+class _JobOutput:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.seq = 0
+        self.buffer = ""
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            self.buffer += text
+            if "\n" in self.buffer:
+                *lines, self.buffer = self.buffer.split("\n")
+                self._append(lines)
+
+    def close(self):
+        with self.lock:
+            if self.buffer:
+                self._append([self.buffer])
+                self.buffer = ""
+
+    def _append(self, lines):
+        rows = []
+        for line in lines:
+            self.seq += 1
+            rows.append((self.job_id, self.seq, line))
+        with closing(db_connect()) as conn, conn:
+            conn.executemany("INSERT INTO job_output (job_id, seq, line) VALUES (?, ?, ?)", rows)
+        _notify_job(self.job_id)
+
+def enqueue_job(op, params):
+    with closing(db_connect()) as conn, conn:
+        c = conn.execute(
+            "INSERT INTO jobs (op, params, status, created_at) VALUES (?, ?, 'queued', ?)",
+            (op, json.dumps(params), datetime.now().isoformat())
+        )
+        job_id = c.lastrowid
+    _job_queue.put(job_id)
+    return job_id
+
+def get_job(job_id, after_seq=0):
+    """Return (job dict, [(seq, line), ...] after after_seq), or (None, [])."""
+    conn = db_connect()
+    c = conn.cursor()
+    c.execute("SELECT id, op, params, status, error, created_at, started_at, finished_at FROM jobs WHERE id = ?", (job_id,))
+    row = c.fetchone()
+    if not row:
+        conn.close()
+        return None, []
+    job = dict(zip(["id", "op", "params", "status", "error", "created_at", "started_at", "finished_at"], row))
+    job["params"] = json.loads(job["params"])
+    # Read status before output so a finished job's output is always complete
+    c.execute("SELECT seq, line FROM job_output WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after_seq))
+    lines = c.fetchall()
+    conn.close()
+    return job, lines
+
+_job_queue = queue.Queue()
+# Jobs for the same app run one after another. The app's current job holds it;
+# later jobs wait in _app_pending instead of blocking a worker.
+_app_holder = {}
+_app_pending = collections.defaultdict(collections.deque)
+_app_guard = threading.Lock()
+
+def _queued_count():
+    with _app_guard:
+        return _job_queue.qsize() + sum(len(pending) for pending in _app_pending.values())
+
+def _release_app(app):
+    """Hand the app to its next pending job, or free it."""
+    with _app_guard:
+        pending = _app_pending.get(app)
+        if pending:
+            next_id = pending.popleft()
+            if not pending:
+                del _app_pending[app]
+            _app_holder[app] = next_id
+            _job_queue.put(next_id)
+        else:
+            _app_holder.pop(app, None)
+
+def _run_job(job_id):
+    conn = db_connect()
+    row = conn.execute("SELECT op, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    if not row:
+        return
+    op, params = row[0], json.loads(row[1])
+    app = params.get("app")
+
+    with _app_guard:
+        holder = _app_holder.get(app)
+        if holder is not None and holder != job_id:
+            _app_pending[app].append(job_id)
+            return
+        _app_holder[app] = job_id
+    try:
+        _execute_job(job_id, op, app, params)
+    finally:
+        _release_app(app)
+
+def _execute_job(job_id, op, app, params):
+    with closing(db_connect()) as conn, conn:
+        claimed = conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                               (datetime.now().isoformat(), job_id)).rowcount
+    if not claimed:
+        return
+
+    output = _JobOutput(job_id)
+    token = _job_sink.set(output)
+    status, error = "done", None
+    try:
+        with span(f"job {op}", app=app, job=job_id):
+            if op == "create":
+                ok = create_app(app, params["db_type"], params.get("domain"))
+            elif op == "test":
+                ok = test_app(app)
+            elif op == "delete":
+                ok = delete_app(app, confirm=False)
+            elif op == "map-domain":
+                ok = map_domain(app, params.get("domain"))
+            elif op == "rescaffold":
+                ok = rescaffold([app])
+        if not ok:
+            status, error = "failed", f"{op} reported a failure; see the job output"
+    except BaseException as e:
+        # SystemExit included: exit() in a job must not take the worker down
+        logging.error(f"Job {job_id} ({op} {app}) failed: {e!r}")
+        status, error = "failed", repr(e)
+    finally:
+        _job_sink.reset(token)
+        try:
+            output.close()
+        except sqlite3.Error as e:
+            logging.error(f"Job {job_id}: could not save the last output line: {e!r}")
+    _finish_job(job_id, status, error)
+
+def _finish_job(job_id, status, error, attempts=5):
+    """Record a job's final status, retrying so it never stays 'running'."""
+    for attempt in range(attempts):
+        try:
+            with closing(db_connect()) as conn, conn:
+                conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                             (status, error, datetime.now().isoformat(), job_id))
+            break
+        except sqlite3.Error as e:
+            logging.error(f"Job {job_id}: could not record status '{status}' (attempt {attempt + 1}): {e!r}")
+            time.sleep(1)
+    _notify_job(job_id)
+
+def _worker_loop():
+    while True:
+        job_id = _job_queue.get()
+        try:
+            _run_job(job_id)
+        except Exception as e:
+            logging.error(f"Worker failed on job {job_id}: {e!r}")
+        finally:
+            _job_queue.task_done()
+
+def _app_rows(columns, app=None):
+    conn = db_connect()
+    c = conn.cursor()
+    if app is None:
+        c.execute(f"SELECT {', '.join(columns)} FROM apps")
+    else:
+        c.execute(f"SELECT {', '.join(columns)} FROM apps WHERE app = ?", (app,))
+    rows = [dict(zip(columns, row)) for row in c.fetchall()]
     conn.close()
+    return rows
+
+class _APIHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        return "unix"
+
+    def log_message(self, format, *args):
+        logging.info("api: " + format % args)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _parts(self):
+        return [p for p in urllib.parse.urlparse(self.path).path.split("/") if p]
+
+    def do_GET(self):
+        parts = self._parts()
+        if parts == ["health"]:
+            return self._send_json(200, {"version": TURBOSHIP_VERSION, "queued": _queued_count()})
+        if parts == ["apps"]:
+            return self._send_json(200, {"apps": _app_rows(LIST_COLUMNS)})
+        if len(parts) == 2 and parts[0] == "apps":
+            rows = _app_rows(APP_COLUMNS, parts[1])
+            if not rows:
+                return self._send_json(404, {"error": f"App '{parts[1]}' not found"})
+            return self._send_json(200, rows[0])
+        if len(parts) in (2, 3) and parts[0] == "jobs" and parts[1].isdigit():
+            if len(parts) == 3 and parts[2] == "stream":
+                return self._stream_job(int(parts[1]))
+            if len(parts) == 2:
+                job, lines = get_job(int(parts[1]))
+                if not job:
+                    return self._send_json(404, {"error": "Job not found"})
+                job["output"] = [line for _, line in lines]
+                return self._send_json(200, job)
+        self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self._parts() != ["jobs"]:
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": "Invalid JSON"})
+        op = body.get("op")
+        if op not in JOB_OPS:
+            return self._send_json(400, {"error": f"Unknown op '{op}'. Use one of: {', '.join(JOB_OPS)}"})
+        missing = [key for key in JOB_OPS[op] if not body.get(key)]
+        if missing:
+            return self._send_json(400, {"error": f"Missing {', '.join(missing)}"})
+        if not validate_app_name(body["app"]):
+            return self._send_json(400, {"error": "Invalid app name"})
+        if op == "create" and body["db_type"] not in DB_TYPES:
+            return self._send_json(400, {"error": f"Invalid db_type '{body['db_type']}'. Use one of: {', '.join(DB_TYPES)}"})
+        if op == "create" and _app_rows(["app"], body["app"]):
+            return self._send_json(409, {"error": f"App '{body['app']}' already exists"})
+        params = {key: body[key] for key in ("app", "db_type", "domain") if body.get(key)}
+        self._send_json(202, {"id": enqueue_job(op, params)})
+
+    def _stream_job(self, job_id):
+        """Send the job's output as NDJSON lines until it finishes."""
+        job, _ = get_job(job_id)
+        if not job:
+            return self._send_json(404, {"error": "Job not found"})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(obj):
+            data = (json.dumps(obj) + "\n").encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        seq = 0
+        try:
+            while True:
+                with _job_changed:
+                    seen = _job_changes[job_id]
+                job, lines = get_job(job_id, seq)
+                for seq, line in lines:
+                    send({"line": line})
+                if job["status"] in FINISHED_STATUSES:
+                    send({"status": job["status"], "error": job["error"]})
+                    break
+                with _job_changed:
+                    # The timeout only guards against a missed wake-up
+                    _job_changed.wait_for(lambda: _job_changes[job_id] != seen, timeout=30)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(socket_path=SOCKET_PATH, workers=SERVE_WORKERS):
+    """Run the local control API on a Unix socket with a fixed worker pool."""
+    global _reload_batcher
+    if daemon_available(socket_path):
+        print(colored(f"❌ A Turboship daemon is already running on {socket_path}", "red"))
+        exit(1)
+    if os.path.exists(socket_path):
+        # Only a socket nobody is listening on is safe to replace
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+        else:
+            print(colored(f"❌ Something is already listening on {socket_path}", "red"))
+            exit(1)
+        finally:
+            probe.close()
+    _reload_batcher = NginxReloadBatcher(NGINX_RELOAD_WINDOW)
+    sys.stdout = _JobStdout(sys.stdout)
+
+    # Jobs that were running when the daemon stopped may be half done; don't replay them
+    with closing(db_connect()) as conn, conn:
+        conn.execute("UPDATE jobs SET status = 'failed', error = 'Interrupted by daemon restart', finished_at = ? WHERE status = 'running'",
+                     (datetime.now().isoformat(),))
+        pending = [row[0] for row in conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id")]
+    for job_id in pending:
+        _job_queue.put(job_id)
+
+    for _ in range(workers):
+        threading.Thread(target=_worker_loop, daemon=True).start()
+
+    # Bind owner-only from the start: the socket accepts connections as soon as it exists
+    old_umask = os.umask(0o077)
+    try:
+        server = _UnixHTTPServer(socket_path, _APIHandler)
+    finally:
+        os.umask(old_umask)
+    print(colored(f"🚀 Turboship API listening on {socket_path} with {workers} workers ({len(pending)} queued jobs resumed)", "green"))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+# ---- Client for a running daemon ----
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def api_request(method, path, body=None, timeout=30, socket_path=SOCKET_PATH):
+    """Call the daemon and return (status, decoded JSON)."""
+    conn = _UnixHTTPConnection(socket_path, timeout=timeout)
+    try:
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+        conn.request(method, path, body=data, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        conn.close()
+
+def daemon_available(socket_path=SOCKET_PATH):
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        return api_request("GET", "/health", timeout=2, socket_path=socket_path)[0] == 200
+    except OSError:
+        return False
+
+def _submit_remote_job(op, params):
+    """Queue a job on the daemon. Returns its id, or None if it was rejected."""
+    status, body = api_request("POST", "/jobs", dict(params, op=op))
+    if status != 202:
+        print(colored(f"❌ [{params.get('app')}] {body.get('error', 'Request failed')}", "red"))
+        return None
+    print(colored(f"⏳ Job {body['id']} queued ({op} {params.get('app')})", "cyan"))
+    return body["id"]
+
+def run_remote_job(op, **params):
+    """Submit a job to the daemon and print its output as it streams in."""
+    job_id = _submit_remote_job(op, params)
+    return job_id is not None and _stream_remote_job(job_id)
+
+def run_remote_jobs(op, apps):
+    """Submit one job per app so the workers run them side by side, then stream each."""
+    job_ids = [_submit_remote_job(op, {"app": app}) for app in apps]
+    ok = None not in job_ids
+    for job_id in job_ids:
+        if job_id is not None:
+            ok = _stream_remote_job(job_id) and ok
+    return ok
+
+def _stream_remote_job(job_id):
+    """Print a job's output until it finishes. Returns False if it failed."""
+    conn = _UnixHTTPConnection(SOCKET_PATH)
+    try:
+        conn.request("GET", f"/jobs/{job_id}/stream")
+        response = conn.getresponse()
+        for raw in response:
+            event = json.loads(raw)
+            if "line" in event:
+                print(event["line"])
+            elif event.get("status") == "failed":
+                print(colored(f"❌ Job {job_id} failed: {event['error']}", "red"))
+                return False
+    finally:
+        conn.close()
+    return True
+
+def forwards_to_daemon(args):
+    """Whether this CLI invocation should be handled by a running daemon."""
+    if args.local or args.command not in ("create", "test", "list", "info", "map-domain", "delete", "rescaffold"):
+        return False
+    if args.command == "delete" and not (args.app or args.all_matching):
+        return False
+    if args.command == "rescaffold" and not (args.app or args.all):
+        return False
+    return daemon_available()
+
+def run_remote(args):
+    """Handle a CLI command through the daemon. Returns False if it failed."""
+    if args.command == "create":
+        app_name = input("Enter app name: ").strip()
+        if not validate_app_name(app_name):
+            print(colored("Invalid app name. Use only letters, numbers, dashes, underscores.", "red"))
+            return False
+        return run_remote_job("create", app=app_name, db_type=prompt_database(), domain=args.domain)
+    elif args.command == "test":
+        return run_remote_job("test", app=args.app)
+    elif args.command == "list":
+        _, body = api_request("GET", "/apps")
+        print_app_table([[app[col] for col in LIST_COLUMNS] for app in body["apps"]])
+    elif args.command == "info":
+        status, body = api_request("GET", f"/apps/{urllib.parse.quote(args.app)}")
+        if status != 200:
+            print(colored(f"❌ App '{args.app}' not found.", "red"))
+            return False
+        print_app_info([body[col] for col in APP_COLUMNS])
+    elif args.command == "map-domain":
+        return run_remote_job("map-domain", app=args.app, domain=args.domain)
+    elif args.command == "delete" and not args.all_matching:
+        if confirm_delete(args.app):
+            return run_remote_job("delete", app=args.app)
+        print("❌ Aborted.")
+    elif args.command == "delete":
+        _, body = api_request("GET", "/apps")
+        apps = sorted(a["app"] for a in body["apps"] if fnmatch.fnmatchcase(a["app"], args.all_matching))
+        if not apps:
+            print(colored(f"❌ No apps match '{args.all_matching}'.", "red"))
+            return True
+        print(colored(f"Apps matching '{args.all_matching}': {', '.join(apps)}", "cyan"))
+        confirm = input(colored(f"⚠️ Are you sure you want to delete these {len(apps)} apps and all their resources? (yes/no): ", "red"))
+        if confirm.lower() != "yes":
+            print("❌ Aborted.")
+            return True
+        return run_remote_jobs("delete", apps)
+    elif args.command == "rescaffold":
+        if args.all:
+            _, body = api_request("GET", "/apps")
+            return run_remote_jobs("rescaffold", sorted(app["app"] for app in body["apps"]))
+        return run_remote_job("rescaffold", app=args.app)
+    return True
 
 def main():
-    init_db()
     parser = argparse.ArgumentParser(
-        description=colored(f"Turboship v{TURBOSHIP_VERSION} - Multi-App Hosting Tool\n\nCommands:\n\ncreate: Create a new app\ntest: Run health checks for an app\nlist: List all created apps\ndelete: Delete an app completely\nmap-domain: Map real domain to existing app\ninfo: Display detailed information about an app", "cyan"),
+        description=colored(f"Turboship v{TURBOSHIP_VERSION} - Multi-App Hosting Tool\n\nCommands:\n\ncreate: Create a new app\ntest: Run health checks for an app\nlist: List all created apps\ndelete: Delete an app completely\nmap-domain: Map real domain to existing app\ninfo: Display detailed information about an app\nrescaffold: Refresh template-derived files of apps\nserve: Run the local HTTP control API daemon", "cyan"),
         formatter_class=argparse.RawTextHelpFormatter
     )
 
+    parser.add_argument("--profile", action="store_true", help="Print a timing profile of the command when it finishes")
+    parser.add_argument("--local", action="store_true", help="Run locally even if a turboship serve daemon is running")
+
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     # Create subcommand
@@ -716,7 +1787,8 @@ def main():
 
     # Delete subcommand
     delete_parser = subparsers.add_parser("delete", help="Delete an app completely")
-    delete_parser.add_argument("app", metavar="APP", help="App name to delete")
+    delete_parser.add_argument("app", metavar="APP", nargs="?", help="App name to delete")
+    delete_parser.add_argument("--all-matching", metavar="PATTERN", help="Delete every app matching a shell-style pattern (e.g. 'test-*')")
 
     # Map-domain subcommand
     map_domain_parser = subparsers.add_parser("map-domain", help="Map real domain to existing app")
@@ -727,9 +1799,28 @@ def main():
     info_parser = subparsers.add_parser("info", help="Display detailed information about an app")
     info_parser.add_argument("app", metavar="APP", help="App name to display information for")
 
-    args = parser.parse_args()
+    # Rescaffold subcommand
+    rescaffold_parser = subparsers.add_parser("rescaffold", help="Refresh template-derived files of apps")
+    rescaffold_parser.add_argument("app", metavar="APP", nargs="?", help="App name to rescaffold")
+    rescaffold_parser.add_argument("--all", action="store_true", help="Rescaffold every app")
+
+    # Serve subcommand
+    serve_parser = subparsers.add_parser("serve", help="Run the local HTTP control API daemon")
+    serve_parser.add_argument("--workers", type=int, default=SERVE_WORKERS, help=f"Number of job workers (default: {SERVE_WORKERS})")
 
-    if not args.command or args.command == "interactive":
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+
+    interactive = not args.command or args.command == "interactive"
+    # The daemon owns the database; a forwarded call never opens it
+    remote = not interactive and forwards_to_daemon(args)
+    if not remote and not interactive:
+        init_db()
+
+    ok = True
+    if interactive:
+        db_ready = False
         try:
             while True:
                 print("\nAvailable Commands:")
@@ -744,27 +1835,45 @@ def main():
                 choice = input("Enter your choice: ").strip()
 
                 if choice == "1":
-                    create_app()
+                    choice_args = argparse.Namespace(command="create", domain=None)
                 elif choice == "2":
-                    app_name = input("Enter app name: ").strip()
-                    test_app(app_name)
+                    choice_args = argparse.Namespace(command="test", app=input("Enter app name: ").strip())
                 elif choice == "3":
-                    list_apps()
+                    choice_args = argparse.Namespace(command="list")
                 elif choice == "4":
-                    app_name = input("Enter app name: ").strip()
-                    delete_app(app_name)
+                    choice_args = argparse.Namespace(command="delete", app=input("Enter app name: ").strip(), all_matching=None)
                 elif choice == "5":
                     app_name = input("Enter app name: ").strip()
-                    domain = input("Enter domain: ").strip()
-                    map_domain(app_name, domain)
+                    choice_args = argparse.Namespace(command="map-domain", app=app_name, domain=input("Enter domain: ").strip())
                 elif choice == "6":
-                    app_name = input("Enter app name: ").strip()
-                    info_app(app_name)
+                    choice_args = argparse.Namespace(command="info", app=input("Enter app name: ").strip())
                 elif choice == "7":
                     print("Exiting interactive mode.")
                     break
                 else:
                     print("Invalid choice. Please try again.")
+                    continue
+
+                # Hand each choice to a running daemon so it stays the only writer
+                choice_args.local = args.local
+                if forwards_to_daemon(choice_args):
+                    run_remote(choice_args)
+                    continue
+                if not db_ready:
+                    init_db()
+                    db_ready = True
+                if choice == "1":
+                    create_app()
+                elif choice == "2":
+                    test_app(choice_args.app)
+                elif choice == "3":
+                    list_apps()
+                elif choice == "4":
+                    delete_app(choice_args.app)
+                elif choice == "5":
+                    map_domain(choice_args.app, choice_args.domain)
+                elif choice == "6":
+                    info_app(choice_args.app)
         except KeyboardInterrupt:
             print("\nExiting Turboship mode gracefully. Goodbye!")
             exit(0)
@@ -774,21 +1883,47 @@ def main():
         print(colored(f"Turboship v{TURBOSHIP_VERSION} CLI", "blue"))
 
         # Command Handling
-        if args.command == "create":
-            create_app()
-        elif args.command == "test":
-            test_app(args.app)
-        elif args.command == "list":
-            list_apps()
-        elif args.command == "delete":
-            delete_app(args.app)
-        elif args.command == "map-domain":
-            map_domain(args.app, args.domain)
-        elif args.command == "info":
-            info_app(args.app)
-        else:
-            print(colored("⚠️  No valid command given.\n", "yellow"))
-            parser.print_help()
+        with span(f"turboship {args.command}", app=getattr(args, "app", None)):
+            if args.command == "serve":
+                serve(workers=args.workers)
+            elif remote:
+                ok = run_remote(args)
+            elif args.command == "create":
+                ok = create_app(domain=args.domain)
+            elif args.command == "test":
+                ok = test_app(args.app)
+            elif args.command == "list":
+                list_apps()
+            elif args.command == "delete":
+                if args.all_matching:
+                    ok = delete_matching_apps(args.all_matching)
+                elif args.app:
+                    ok = delete_app(args.app)
+                else:
+                    print(colored("⚠️  Specify an app name or --all-matching PATTERN.\n", "yellow"))
+                    delete_parser.print_help()
+            elif args.command == "map-domain":
+                ok = map_domain(args.app, args.domain)
+            elif args.command == "info":
+                info_app(args.app)
+            elif args.command == "rescaffold":
+                if args.all:
+                    conn = db_connect()
+                    apps = [row[0] for row in conn.execute("SELECT app FROM apps")]
+                    conn.close()
+                    ok = rescaffold(apps)
+                elif args.app:
+                    ok = rescaffold([args.app])
+                else:
+                    print(colored("⚠️  Specify an app name or --all.\n", "yellow"))
+                    rescaffold_parser.print_help()
+            else:
+                print(colored("⚠️  No valid command given.\n", "yellow"))
+                parser.print_help()
+
+    print_profile()
+    if not ok:
+        exit(1)
 
 if __name__ == "__main__":
     main()